@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Annotated, Sequence, TypedDict, Dict, Any
+from typing import Annotated, Sequence, TypedDict, Dict, Any, Optional
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
@@ -7,145 +7,187 @@ from langgraph.checkpoint.memory import MemorySaver
 from langgraph.store.memory import InMemoryStore
 from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_openai import ChatOpenAI
-import os
-from dotenv import load_dotenv
+import functools
+import httpx
+from ..config import REDIS_URL, CHECKPOINT_TTL_MINUTES
 from ..tools import get_tools
 
-load_dotenv()
-
-__all__ = ["AgentStateGraph, build_workflow"]
-
-checkpointer = MemorySaver()
-memory_store = InMemoryStore()
+__all__ = ["AgentState", "SHARED_CHECKPOINTER", "build_workflow", "setup_persistence"]
+
+# Only a Redis checkpointer is visible to every server worker; MemorySaver lives in one process
+SHARED_CHECKPOINTER = bool(REDIS_URL)
+
+# (checkpointer, store), created by the first setup_persistence() call
+_persistence: Optional[tuple[Any, Any]] = None
+
+async def _build_persistence() -> tuple[Any, Any]:
+    """Use Redis-backed checkpoints and store when REDIS_URL is set, in-memory ones otherwise."""
+    if not SHARED_CHECKPOINTER:
+        return MemorySaver(), InMemoryStore()
+
+    try:
+        from langgraph.checkpoint.redis import AsyncRedisSaver
+        from langgraph.store.redis import AsyncRedisStore
+    except ImportError as e:
+        raise ImportError(
+            "REDIS_URL is set but langgraph-checkpoint-redis is not installed "
+            "(install the 'redis' extra)."
+        ) from e
+
+    # Idle threads expire instead of accumulating forever; refreshed on every read
+    ttl = {"default_ttl": CHECKPOINT_TTL_MINUTES, "refresh_on_read": True}
+    # The Redis clients bind to the running event loop, so they are only built inside it
+    checkpointer = AsyncRedisSaver(redis_url=REDIS_URL, ttl=ttl)
+    memory_store = AsyncRedisStore(redis_url=REDIS_URL, ttl=ttl)
+    await checkpointer.asetup()
+    await memory_store.setup()
+    return checkpointer, memory_store
+
+async def setup_persistence() -> tuple[Any, Any]:
+    """
+    Create the checkpointer and store once, inside the running event loop, and return them.
+    With Redis this also creates the search indices.
+    """
+    global _persistence
+    if _persistence is None:
+        _persistence = await _build_persistence()
+    return _persistence
+
+http_async_client = httpx.AsyncClient()
+
+# Kept byte-identical across calls and always sent first so OpenAI prompt
+# caching can reuse the prefix. Per-request context belongs in later messages.
+SYSTEM_PROMPT = SystemMessage(content="""
+You are NutriGuide, a tool-using nutrition analysis and meal-planning agent that behaves like a highly skilled human nutritionist.
+
+MISSION
+- Identify foods and meals as healthy vs unhealthy (with reasons).
+- Calculate nutrition for each item and the full meal: calories, macros, and micronutrients.
+- Suggest personalized meal patterns for each person based on their profile and goals.
+- If a meal image is provided, identify items, estimate portions, and compute nutrition per item and for the whole meal.
+- Use available tools (APIs / databases / vision / IBM services) to improve accuracy whenever possible.
+
+INPUTS YOU MAY RECEIVE
+- Text describing foods/meals, ingredients, recipes, restaurants, labels.
+- Portions in grams/cups/pieces OR vague portions (small/medium/large).
+- Nutrition labels (per serving + servings).
+- User profile: age, sex, height, weight, activity, goals, diet preference, allergies, medical conditions.
+- Images of meals (one or multiple).
+- Tool outputs (nutrition database results, OCR, image recognition, IBM results).
+
+CORE BEHAVIOR RULES
+1) Be accurate and transparent:
+- Do NOT guess silently. If quantities/brands are missing, either ask the minimum needed OR proceed with reasonable defaults.
+- Always state assumptions (portion size, cooking oil, sauces, etc.).
+- Provide a confidence rating: High / Medium / Low.
+
+2) Always use tools when helpful:
+- If nutrition database tools exist, use them for each ingredient/item.
+- If an image tool exists, use it to identify foods and estimate portions.
+- If IBM services exist, use them for recognition and recommendations.
+- If a tool is unavailable or fails, fall back to best-effort estimates and say so.
+
+3) Health classification logic:
+- Rate each item and the full meal as: Healthy / Neutral / Less healthy / Unhealthy.
+- Consider: ultra-processing, added sugar, fiber, sodium, saturated fat, trans fat, portion size, protein quality, fruit/veg/whole grains, overall balance.
+
+4) Nutrition outputs:
+- For each item and meal total, estimate:
+    - Calories (kcal)
+    - Protein (g)
+    - Carbohydrate (g)
+    - Sugar (g)
+    - Fiber (g)
+    - Fat (g)
+    - Saturated fat (g)
+    - Sodium (mg)
+- Micronutrients (as available from data/tools):
+    - Potassium, Calcium, Iron, Magnesium, Zinc
+    - Vitamins A, C, D, E, K, B12, Folate
+- If micronutrient data is not available, state: “Micronutrients unavailable from provided data” and provide qualitative hints (e.g., “likely higher in vitamin C if citrus/vegetables present”).
+
+5) Image meal estimation:
+- Identify visible items and likely preparation methods.
+- Estimate portion sizes using common references (plate size, common serving sizes).
+- Output per-item + total nutrition and a confidence rating.
+- Clearly label image-based nutrition as approximate.
+
+6) Personalization & meal patterns:
+- If user profile is provided, tailor meal patterns to goals (fat loss, muscle gain, diabetes-friendly, heart-healthy, etc.).
+- Provide:
+    - Daily meal structure (breakfast/lunch/dinner/snacks)
+    - Portion guidance (plate method or grams)
+    - Example 1-day menu and smart swaps
+    - Weekly pattern tips
+- If profile is missing, provide a general healthy pattern and ask for the minimal info needed to personalize further.
+
+SAFETY & MEDICAL RULES (STRICT)
+- You are not a doctor. Do not diagnose, prescribe, or claim to treat diseases.
+- Do not recommend extreme restriction, starvation, unsafe detoxes, or eating-disorder behaviors.
+- For pregnancy, eating disorders, kidney disease, severe diabetes/insulin use, heart failure, or complex medical cases:
+- Provide general education + advise consulting a licensed clinician/dietitian.
+- If the user requests medication-level advice or disease treatment, respond with safe general guidance and a referral suggestion.
+
+RESPONSE FORMAT (ALWAYS FOLLOW)
+For any meal analysis (text or image):
+A) Health Rating: per-item (if multiple) and overall rating, with 3–6 reasons.
+B) Nutrition Breakdown (Estimated): per-item list/table (kcal, protein, carbs, sugar, fiber, fat, sat fat, sodium, key micros when available), meal total, confidence (High/Medium/Low), assumptions used.
+C) Micronutrient Highlights: nutrients likely high vs potentially low/missing.
+D) Improvements / Swaps: 3–7 practical changes (protein, fiber, veg, less sodium/sugar, healthier fats).
+E) Personalized Meal Pattern: meal timing + portions, 1-day example menu, weekly tips. Without profile/goals, give a general pattern + minimal questions.
+
+DEFAULT ASSUMPTIONS (ONLY IF NEEDED)
+- Rice cooked 1 cup ≈ 150–200 g
+- Cooked chicken breast (palm-size) ≈ 100–120 g
+- Cooking oil 1 tsp ≈ 5 g (40 kcal)
+- “Small/Medium/Large” approximations must be stated.
+- Restaurant meals: assume moderate oil/salt unless user says otherwise.
+
+TOOL CALLING
+- If the user provides a label, prefer label data over database averages.
+- If conflicting results appear, explain the difference and choose the most reliable source.
+- When items are independent (e.g. several ingredients in one meal), issue their tool calls in parallel in a single turn instead of one at a time.
+- Meal image analysis is slow: call submit_meal_image, run other lookups meanwhile, and collect the result with poll_meal_image (with wait_seconds) before answering; task ids are not valid in later messages.
+- For two or more meal images at once (e.g. a day's breakfast, lunch and dinner), call analyze_meal_images with all paths instead of one submit_meal_image per image.
+- Never expose tool keys, secrets, or internal chain-of-thought. Provide only user-relevant results.
+
+Your goal is to provide nutrition guidance that is practical, accurate, transparent, and personalized.
+""")
+
+# Appended after the history (never merged into SYSTEM_PROMPT) so each routing call
+# starts with the SYSTEM_PROMPT + history prefix its earlier calls in the tool loop cached.
+# Prompt caches are per model, so nothing here is shared with the gpt-4o synthesis call.
+ROUTER_PROMPT = SystemMessage(content=(
+    "You are the tool-routing step. If more data is needed, call the tools. "
+    "Otherwise reply with exactly READY; the final answer is written by a later step."
+))
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
 
-def build_workflow() -> Any:
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.3)
-    tools = get_tools(llm)
-    llm_with_tool = llm.bind_tools(tools)
-
-    def llm_call(state:AgentState) -> AgentState:
-        system_prompt = SystemMessage(content = (
-            """
-                You are NutriGuide, a tool-using nutrition analysis and meal-planning agent that behaves like a highly skilled human nutritionist.
-
-                MISSION
-                - Identify foods and meals as healthy vs unhealthy (with reasons).
-                - Calculate nutrition for each item and the full meal: calories, macros, and micronutrients.
-                - Suggest personalized meal patterns for each person based on their profile and goals.
-                - If a meal image is provided, identify items, estimate portions, and compute nutrition per item and for the whole meal.
-                - Use available tools (APIs / databases / vision / IBM services) to improve accuracy whenever possible.
-
-                INPUTS YOU MAY RECEIVE
-                - Text describing foods/meals, ingredients, recipes, restaurants, labels.
-                - Portions in grams/cups/pieces OR vague portions (small/medium/large).
-                - Nutrition labels (per serving + servings).
-                - User profile: age, sex, height, weight, activity, goals, diet preference, allergies, medical conditions.
-                - Images of meals (one or multiple).
-                - Tool outputs (nutrition database results, OCR, image recognition, IBM results).
-
-                CORE BEHAVIOR RULES
-                1) Be accurate and transparent:
-                - Do NOT guess silently. If quantities/brands are missing, either ask the minimum needed OR proceed with reasonable defaults.
-                - Always state assumptions (portion size, cooking oil, sauces, etc.).
-                - Provide a confidence rating: High / Medium / Low.
-
-                2) Always use tools when helpful:
-                - If nutrition database tools exist, use them for each ingredient/item.
-                - If an image tool exists, use it to identify foods and estimate portions.
-                - If IBM services exist, use them for recognition and recommendations.
-                - If a tool is unavailable or fails, fall back to best-effort estimates and say so.
-
-                3) Health classification logic:
-                - Rate each item and the full meal as: Healthy / Neutral / Less healthy / Unhealthy.
-                - Consider: ultra-processing, added sugar, fiber, sodium, saturated fat, trans fat, portion size, protein quality, fruit/veg/whole grains, overall balance.
-
-                4) Nutrition outputs:
-                - For each item and meal total, estimate:
-                    - Calories (kcal)
-                    - Protein (g)
-                    - Carbohydrate (g)
-                    - Sugar (g)
-                    - Fiber (g)
-                    - Fat (g)
-                    - Saturated fat (g)
-                    - Sodium (mg)
-                - Micronutrients (as available from data/tools):
-                    - Potassium, Calcium, Iron, Magnesium, Zinc
-                    - Vitamins A, C, D, E, K, B12, Folate
-                - If micronutrient data is not available, state: “Micronutrients unavailable from provided data” and provide qualitative hints (e.g., “likely higher in vitamin C if citrus/vegetables present”).
-
-                5) Image meal estimation:
-                - Identify visible items and likely preparation methods.
-                - Estimate portion sizes using common references (plate size, common serving sizes).
-                - Output per-item + total nutrition and a confidence rating.
-                - Clearly label image-based nutrition as approximate.
-
-                6) Personalization & meal patterns:
-                - If user profile is provided, tailor meal patterns to goals (fat loss, muscle gain, diabetes-friendly, heart-healthy, etc.).
-                - Provide:
-                    - Daily meal structure (breakfast/lunch/dinner/snacks)
-                    - Portion guidance (plate method or grams)
-                    - Example 1-day menu and smart swaps
-                    - Weekly pattern tips
-                - If profile is missing, provide a general healthy pattern and ask for the minimal info needed to personalize further.
-
-                SAFETY & MEDICAL RULES (STRICT)
-                - You are not a doctor. Do not diagnose, prescribe, or claim to treat diseases.
-                - Do not recommend extreme restriction, starvation, unsafe detoxes, or eating-disorder behaviors.
-                - For pregnancy, eating disorders, kidney disease, severe diabetes/insulin use, heart failure, or complex medical cases:
-                - Provide general education + advise consulting a licensed clinician/dietitian.
-                - If the user requests medication-level advice or disease treatment, respond with safe general guidance and a referral suggestion.
-
-                RESPONSE FORMAT (ALWAYS FOLLOW)
-                When analyzing a meal (text or image), respond with:
-
-                A) Health Rating
-                - Item ratings (if multiple)
-                - Overall meal rating
-                - Reasons (3–6 bullets)
-
-                B) Nutrition Breakdown (Estimated)
-                - Per-item list or table including: kcal, protein, carbs, sugar, fiber, fat, sat fat, sodium
-                - Add key micronutrients when available
-                - Meal Total
-                - Confidence: High/Medium/Low
-                - Assumptions used
-
-                C) Micronutrient Highlights
-                - Nutrients likely high in
-                - Nutrients potentially low / missing
-
-                D) Improvements / Swaps
-                - 3–7 practical changes to improve balance (protein, fiber, veg, reduce sodium/sugar, healthier fats)
-
-                E) Personalized Meal Pattern (only if profile/goals available; otherwise provide general pattern + minimal questions)
-                - Meal timing + portions
-                - 1-day example menu
-                - Weekly pattern tips
-
-                DEFAULT ASSUMPTIONS (ONLY IF NEEDED)
-                - Rice cooked 1 cup ≈ 150–200 g
-                - Cooked chicken breast (palm-size) ≈ 100–120 g
-                - Cooking oil 1 tsp ≈ 5 g (40 kcal)
-                - “Small/Medium/Large” approximations must be stated.
-                - Restaurant meals: assume moderate oil/salt unless user says otherwise.
-
-                TOOL CALLING
-                - If the user provides a label, prefer label data over database averages.
-                - If conflicting results appear, explain the difference and choose the most reliable source.
-                - Never expose tool keys, secrets, or internal chain-of-thought. Provide only user-relevant results.
-
-                Your goal is to provide nutrition guidance that is practical, accurate, transparent, and personalized.
-            """
-        ))
-
-        response = llm_with_tool.invoke(
-            [system_prompt] + list(state["messages"])
+@functools.lru_cache(maxsize=1)
+def build_workflow(checkpointer: Any, memory_store: Any) -> Any:
+    """Build and compile the agent graph once; later calls reuse the compiled app."""
+    router_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, http_async_client=http_async_client)
+    synth_llm = ChatOpenAI(model="gpt-4o", temperature=0.3, streaming=True, http_async_client=http_async_client)
+    tools = get_tools(synth_llm)
+    router_with_tool = router_llm.bind_tools(tools, parallel_tool_calls=True)
+
+    async def route_call(state:AgentState) -> AgentState:
+        """Let the small model decide on tool calls; only keep its message if it calls tools."""
+        response = await router_with_tool.ainvoke(
+            [SYSTEM_PROMPT] + list(state["messages"]) + [ROUTER_PROMPT]
+        )
+        if response.tool_calls:
+            return {"messages": [response]}
+        return {}
+
+    async def synthesize_call(state:AgentState) -> AgentState:
+        # No tools bound: the synthesizer only writes the answer, so their schemas are not sent
+        response = await synth_llm.ainvoke(
+            [SYSTEM_PROMPT] + list(state["messages"])
         )
-        return {"messages": state["messages"] + [response]}
+        return {"messages": [response]}
     
     def decision_node(state:AgentState) -> str:
         last_message = state["messages"][-1]
@@ -154,18 +196,22 @@ def build_workflow() -> Any:
         return "end"
     
     workflow = StateGraph(AgentState)
-    workflow.add_node("agent", llm_call)
-    tool_node = ToolNode(tools=tools)
+    workflow.add_node("route", route_call)
+    workflow.add_node("synthesize", synthesize_call)
+    # Failing tools answer with an error ToolMessage, so the checkpointed thread never
+    # keeps an AIMessage whose tool_calls have no matching results
+    tool_node = ToolNode(tools=tools, handle_tool_errors=True)
     workflow.add_node("tool", tool_node)
-    workflow.add_edge(START, "agent")
+    workflow.add_edge(START, "route")
     workflow.add_conditional_edges(
-        "agent",
+        "route",
         decision_node,
         {
             "continue": "tool",
-            "end": END,
+            "end": "synthesize",
         },
     )
-    workflow.add_edge("tool", "agent")
+    workflow.add_edge("tool", "route")
+    workflow.add_edge("synthesize", END)
 
     return workflow.compile(checkpointer=checkpointer, store=memory_store)
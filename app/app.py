@@ -1,23 +1,52 @@
-from app.agent.workflow import build_workflow
+import asyncio
+import uuid
+from typing import List
+from app.agent.workflow import build_workflow, setup_persistence
 from langchain_core.messages import HumanMessage
 
-def app():
+async def app():
     
-    workflow = build_workflow()
+    workflow = build_workflow(*await setup_persistence())
     
     config = {"configurable": {"thread_id": "1"}}
     
     user_input = "Analyze this meal: grilled chicken breast (150g), brown rice (1 cup), steamed broccoli (100g)"
     
-    result = workflow.invoke(
-        {"messages": [HumanMessage(content=user_input)]},
-        config=config
-    )
-    
     print("\n" + "="*80)
     print("AGENT RESPONSE:")
     print("="*80)
-    print(result["messages"][-1].content)
 
-if __name__ == "app":
-    app()
\ No newline at end of file
+    # Print tokens as the model produces them instead of waiting for the full run
+    async for event in workflow.astream_events(
+        {"messages": [HumanMessage(content=user_input)]},
+        config=config,
+        version="v2",
+    ):
+        # Only the synthesize node writes the user-facing answer
+        if (
+            event["event"] == "on_chat_model_stream"
+            and event["metadata"].get("langgraph_node") == "synthesize"
+        ):
+            content = event["data"]["chunk"].content
+            if content:
+                print(content, end="", flush=True)
+    print()
+
+async def app_batch(user_inputs: List[str], max_concurrency: int = 16) -> List[str]:
+    """Run independent user inputs through the shared workflow concurrently, one thread each."""
+    workflow = build_workflow(*await setup_persistence())
+
+    # Fresh thread ids so batch runs never pick up each other's checkpointed history
+    batch_id = uuid.uuid4().hex[:8]
+    configs = [
+        {"configurable": {"thread_id": f"batch_{batch_id}_{i}"}, "max_concurrency": max_concurrency}
+        for i in range(len(user_inputs))
+    ]
+    results = await workflow.abatch(
+        [{"messages": [HumanMessage(content=user_input)]} for user_input in user_inputs],
+        config=configs,
+    )
+    return [result["messages"][-1].content for result in results]
+
+if __name__ == "__main__":
+    asyncio.run(app())
@@ -0,0 +1,22 @@
+import os
+from dotenv import load_dotenv
+
+# Loaded once per process; every other module imports its settings from here
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+
+def _secret(name: str) -> str:
+    """Read a secret from the environment, dropping stray whitespace and quotes."""
+    return os.getenv(name, '').strip().strip('\'"').strip()
+
+
+OPENAI_API_KEY: str = _secret('OPENAI_API_KEY')
+TAVILY_API_KEY: str = _secret('TAVILY_API_KEY')
+
+REDIS_URL: str = os.getenv('REDIS_URL', '')
+CHECKPOINT_TTL_MINUTES: int = int(os.getenv('CHECKPOINT_TTL_MINUTES', '60'))
+
+# Comma-separated list of allowed browser origins for the API; "*" allows any origin
+CORS_ORIGINS: list[str] = [
+    origin.strip() for origin in os.getenv('CORS_ORIGINS', '*').split(',') if origin.strip()
+]
@@ -1,8 +1,15 @@
 from typing import List
 from langchain_core.tools import BaseTool
-from .websearch import web_search_nutrition
+from .websearch import web_search_nutrition, web_search_nutrition_many
+from .meals_detect import analyze_meal_images, submit_meal_image, poll_meal_image
 
 def get_tools(llm=None) -> List[BaseTool]:
     """Return a list of available tools for the agent."""
-    return [web_search_nutrition]
+    return [
+        web_search_nutrition,
+        web_search_nutrition_many,
+        submit_meal_image,
+        poll_meal_image,
+        analyze_meal_images,
+    ]
 __all__ = ["get_tools"]
\ No newline at end of file
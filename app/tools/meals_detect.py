@@ -1,21 +1,96 @@
 import os
 import base64
-from dotenv import load_dotenv
+import uuid
+import functools
+import asyncio
+import httpx
+from types import MappingProxyType
+from typing import Any, Dict, List
+from pydantic import BaseModel
 from langchain.tools import tool
-from openai import OpenAI
-
-env_path = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
-load_dotenv(env_path)
-
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '').strip().strip('\'"').strip()
+from openai import AsyncOpenAI
+from ..config import OPENAI_API_KEY
 
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY is not set in environment variables.")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=64)),
+)
+
+_MIME_BY_EXT = MappingProxyType({
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp'
+})
+
+# Shape of one meal analysis, shared by the single- and multi-image prompts
+MEAL_JSON_SCHEMA = """{
+  "detected_items": [{"name": str, "confidence": "high|medium|low", "estimated_portion": str, "notes": str}],
+  "per_item_nutrition": [{"name": str, "calories": number, "macros": {...}, "micros": {...}}],
+  "meal_totals": {"calories": number, "macros": {...}, "micros": {...}},
+  "classification": {"overall": "health-supporting|neutral|limit", "rationale": [str], "warnings": [str]},
+  "suggestions": {"swaps": [str], "portion_adjustments": [str], "add_ons": [str]},
+  "assumptions": [str],
+  "confidence": {"overall": "high|medium|low", "by_item": {"<item name>": "high|medium|low"}},
+  "questions": [str]
+}"""
+
+ANALYSIS_RULES = """
+- Detect every food/drink item and its likely preparation; estimate portions in g/ml with household units, as ranges when unsure.
+- Classify each item and the meal as health-supporting / neutral / limit from processing, added sugar, sodium, sat/trans fat, fiber, protein and portion size. Never moralize food.
+- Estimate calories, protein, carbs (fiber, sugar) and fat (sat fat) per item and for the meal. Include sodium, potassium, calcium, iron, magnesium, zinc and vitamins only when reliable; otherwise "data not available".
+- Answer the user's question through practical swaps, portion adjustments and add-ons.
+- Record every assumption (portions, oils, sauces, cooking method). If confidence is low, ask 1-3 short clarifying questions.
+- You are not a doctor: no diagnosis, extreme diets, unsafe supplements or detox claims; refer complex medical cases to a clinician.
+"""
+
+SYSTEM_PROMPT = f"""
+You are a registered-dietitian level nutritionist analyzing a meal photo.
+{ANALYSIS_RULES}
+Respond with a single JSON object and no prose, matching:
+{MEAL_JSON_SCHEMA}
+"""
+
+# Latency per image improves with batch size up to a knee, then degrades;
+# larger uploads are split into requests of at most this many images.
+MAX_IMAGES_PER_REQUEST = 4
+
+BATCH_SYSTEM_PROMPT = f"""
+You are a registered-dietitian level nutritionist analyzing several meal photos at once.
+Apply these rules to EACH image:
+{ANALYSIS_RULES}
+Respond with a single JSON object and no prose, of the form {{"meals": [...]}}.
+Each entry matches the schema below plus "image_index" (0-based position of the image in this request).
+Return exactly one entry per image, in image order.
+{MEAL_JSON_SCHEMA}
+"""
+
+
+class MealAnalysis(BaseModel):
+    detected_items: List[Dict[str, Any]] = []
+    per_item_nutrition: List[Dict[str, Any]] = []
+    meal_totals: Dict[str, Any] = {}
+    classification: Dict[str, Any] = {}
+    suggestions: Dict[str, Any] = {}
+    assumptions: List[Any] = []
+    confidence: Dict[str, Any] = {}
+    questions: List[Any] = []
+
+
+class MealImageAnalysis(MealAnalysis):
+    image_index: int
+
+
+class MealImageBatch(BaseModel):
+    meals: List[MealImageAnalysis]
+
 
 @tool
-def analyze_meal_image(image_path: str, user_question:str = "") -> dict:
+async def analyze_meal_image(image_path: str, user_question:str = "") -> dict:
     """
     Direct function to analyze meal images using the OpenAI Vision API.
     Use this for server endpoints that need direct access to image-based
@@ -45,14 +120,17 @@ def analyze_meal_image(image_path: str, user_question:str = "") -> dict:
 
     Returns:
         dict:
-            A structured result suitable for APIs and UI rendering, typically containing:
-              - detected_items: [{name, confidence, estimated_portion, notes}]
-              - per_item_nutrition: [{name, calories, macros, micros}]
-              - meal_totals: {calories, macros, micros}
-              - health_classification: {overall, rationale, flags (high sodium, low fiber, etc.)}
-              - suggestions: {portion_adjustments, swaps, add_ons}
-              - assumptions: [list of assumptions made]
-              - confidence: {"overall": "high|medium|low", "by_item": {...}}
+            A structured result suitable for APIs and UI rendering:
+              - analysis:
+                  - detected_items: [{name, confidence, estimated_portion, notes}]
+                  - per_item_nutrition: [{name, calories, macros, micros}]
+                  - meal_totals: {calories, macros, micros}
+                  - classification: {overall, rationale, warnings (high sodium, low fiber, etc.)}
+                  - suggestions: {portion_adjustments, swaps, add_ons}
+                  - assumptions: [list of assumptions made]
+                  - confidence: {"overall": "high|medium|low", "by_item": {...}}
+                  - questions: [quick confirmations for the user]
+              - model, tokens_used, image_path, user_question
 
     Notes / Constraints:
     - Image-based portion estimation is approximate. If confidence is low, the function should
@@ -62,12 +140,43 @@ def analyze_meal_image(image_path: str, user_question:str = "") -> dict:
       Otherwise, return clearly-labeled estimates and avoid claiming precision.
     """
 
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image not found: {image_path}")
+    return await _analyze_meal_image_impl(image_path, user_question)
+
+def _image_data_url(image_path: str) -> str:
+    """Read an image from disk and return it as a base64 data URL for the Vision API."""
+    # Read and encode image as base64
+    with open(image_path, "rb") as image_file:
+        image_base64 = base64.b64encode(image_file.read()).decode('ascii')
+
+    # Determine image format
+    image_ext = os.path.splitext(image_path)[1].lower()
+    mime_type = _MIME_BY_EXT.get(image_ext, 'image/jpeg')
+
+    return f"data:{mime_type};base64,{image_base64}"
 
-    return analyze_meal_image(image_path, user_question)
+# A response cut off at max_tokens is invalid JSON; it is retried once with this much more budget
+TRUNCATION_RETRY_FACTOR = 2
 
-def analyze_meal_image(image_path: str, user_question: str) -> dict:
+async def _create_json_completion(messages: List[dict], max_tokens: int) -> tuple[Any, int]:
+    """
+    Request a JSON completion, retrying once with a larger budget if the output was truncated.
+    Returns the response and the tokens used across all attempts.
+    """
+    tokens_used = 0
+    for budget in (max_tokens, max_tokens * TRUNCATION_RETRY_FACTOR):
+        response = await client.chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            response_format={"type": "json_object"},
+            max_tokens=budget,
+            temperature=0.7
+        )
+        tokens_used += response.usage.total_tokens
+        if response.choices[0].finish_reason != "length":
+            return response, tokens_used
+    raise RuntimeError(f"Vision response was truncated at {budget} tokens")
+
+async def _analyze_meal_image_impl(image_path: str, user_question: str) -> dict:
     """
     Direct function to analyze meal/food images using the OpenAI Vision API.
 
@@ -94,7 +203,7 @@ def analyze_meal_image(image_path: str, user_question: str) -> dict:
 
     Returns:
         dict:
-            A structured result containing (typical keys):
+            - analysis: the parsed JSON analysis (see MealAnalysis), containing:
               - detected_items: list of {name, confidence, estimated_portion, notes}
               - per_item_nutrition: list of {name, calories, macros, micros}
               - meal_totals: {calories, macros, micros}
@@ -102,203 +211,22 @@ def analyze_meal_image(image_path: str, user_question: str) -> dict:
               - suggestions: {swaps, portion_adjustments, add_ons}
               - assumptions: list[str]
               - confidence: {overall, by_item}
+              - questions: list[str]
+            - model, tokens_used, image_path, user_question
 
     Important:
     - Image-based portion estimation is approximate. If uncertain, return ranges and record assumptions.
     - If you have a nutrition database/RAG tool, numeric nutrition values MUST come from it.
       If not available, return clearly labeled estimates and avoid claiming precision.
     """
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image not found: {image_path}")
+    # Raises FileNotFoundError for a missing image; read off the event loop
+    image_url = await asyncio.to_thread(_image_data_url, image_path)
     try:
-        # Read and encode image as base64
-        with open(image_path, "rb") as image_file:
-            image_data = image_file.read()
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-
-        # Determine image format
-        image_ext = os.path.splitext(image_path)[1].lower()
-        mime_type = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp'
-        }.get(image_ext, 'image/jpeg')
-
-        system_prompt = """
-You are a fully professional Human Nutritionist AI Assistant (registered-dietitian level style).
-Your role is to analyze foods and meals (from text and/or images), classify foods as health-supporting vs. limit (context-aware),
-calculate meal nutrition (macros + micronutrients), and recommend personalized meal patterns for each person.
-
-You must behave like a careful, evidence-based nutrition professional:
-- Be accurate, practical, culturally sensitive, and non-judgmental.
-- Never shame the user or moralize food.
-- Never invent exact nutrition numbers if you do not have data; use ranges and clearly label estimates.
-- Always explain assumptions (portion sizes, oils, cooking methods, sauces, brands, recipe variations).
-
-────────────────────────────────────────────────────────────────────────────
-A) PRIMARY TASKS
-────────────────────────────────────────────────────────────────────────────
-
-1) Food & Meal Identification (Text + Image)
-- If the user provides a meal photo, identify each visible food/drink item and its likely preparation method.
-- If the user provides a text description, parse it into distinct items (including sauces, oils, toppings, beverages).
-- Output each item with:
-  • name (normalized, e.g., “white rice, cooked” not just “rice”)
-  • confidence level (high/medium/low)
-  • estimated portion (grams/ml, cups, pieces) with a range when uncertain
-  • notes (e.g., “could be fried”, “sauce may increase sugar/sodium”)
-
-2) Healthy vs Unhealthy Classification (Context-Aware)
-- Classify each item AND the overall meal as one of:
-  • Health-supporting
-  • Neutral / mixed
-  • Limit (frequent intake may harm goals/health)
-- This is NOT moral judgment; it is a goal- and context-based classification.
-- Consider:
-  • processing level (ultra-processed vs whole foods)
-  • added sugars
-  • sodium
-  • saturated/trans fats
-  • fiber and whole grains
-  • protein quality and quantity
-  • micronutrient density
-  • cooking method (fried, deep fried, heavy oil, creamy sauces)
-  • portion size and frequency
-- Always explain the “why” in plain language.
-
-3) Nutrition Calculation (Per Item + Full Meal)
-Compute and present nutrition estimates for:
-- MACROS:
-  • Calories (kcal)
-  • Protein (g)
-  • Carbohydrates (g) including fiber (g) and sugar (g) when possible
-  • Fat (g) including saturated fat (g) when possible
-- MICRONUTRIENTS (when data available):
-  • Sodium, potassium
-  • Calcium, iron, magnesium, zinc
-  • Vitamins A, C, D, E, K
-  • B vitamins (B1, B2, B3, B6, B12), folate
-  • Other relevant nutrients when appropriate (cholesterol, omega-3, etc.)
-- Provide:
-  • Per-item breakdown
-  • Full meal totals
-  • Key highlights (e.g., “high sodium”, “low fiber”, “good iron”, “protein adequate”)
-- If you cannot calculate a micronutrient reliably, say “data not available” instead of guessing.
-
-4) Personalized Nutrition Interpretation
-When user details are available, interpret the meal vs their needs:
-- Goal alignment:
-  • Fat loss: calorie density, satiety, protein + fiber
-  • Muscle gain: total calories, protein distribution, carb support
-  • Endurance/performance: carbs timing, hydration/electrolytes
-  • Diabetes/PCOS: glycemic load, fiber, protein/fat pairing, added sugar
-  • Hypertension: sodium/potassium balance
-  • High cholesterol: saturated fat, fiber, overall pattern
-  • Kidney concerns: sodium/potassium/protein caution (general guidance only)
-- Identify:
-  • what’s strong about the meal
-  • what’s missing
-  • what to adjust for the user’s goal
-
-5) Meal Pattern & Plan Suggestions
-Provide meal-pattern recommendations that are realistic and sustainable:
-- Offer 1–3 pattern options (choose based on user goal and culture):
-  • Balanced Plate (½ veg, ¼ protein, ¼ carbs + healthy fats)
-  • High-Protein pattern
-  • Mediterranean-style pattern
-  • Low-GI pattern
-  • High-fiber pattern
-  • Budget-friendly pattern
-- Provide:
-  • daily structure suggestions (e.g., 3 meals + 1 snack)
-  • examples for breakfast/lunch/dinner/snacks
-  • simple swaps (white rice → mixed grains; fried → grilled; sugary drink → unsweetened)
-  • “next meal” suggestion that complements the current meal (fixes missing nutrients)
-
-6) Image-Based Portion & Item Verification (IBM/OpenAI Vision pipeline)
-- If an image is provided, you MUST do visual analysis first (detect items, estimate portions).
-- If confidence is low, ask 1–3 short clarifying questions (NOT a long interview), for example:
-  • “Is that chicken or tofu?”
-  • “About how many cups of rice?”
-  • “Was it cooked with a lot of oil?”
-- Still provide a best-effort estimate with ranges and clearly stated assumptions.
-
-────────────────────────────────────────────────────────────────────────────
-B) REQUIRED OUTPUT FORMAT
-────────────────────────────────────────────────────────────────────────────
-Always respond in this structure (adapt as needed):
-
-1) Detected Items (with confidence + portions)
-- Item 1 …
-- Item 2 …
-
-2) Meal Health Summary
-- Overall classification: health-supporting / neutral / limit
-- Reasons (bullet points)
-- Flags: high sodium / low fiber / low protein / high added sugar / high sat fat / low vegetables, etc.
-
-3) Nutrition Breakdown
-- Per-item nutrition table (or bullet list if table not possible)
-- Total meal nutrition summary
-- Micronutrient highlights (top 3–6 notable highs/lows)
-
-4) Practical Improvements (Actionable)
-- Portion tweaks
-- Swaps
-- Add-ons (e.g., add vegetables, add legumes, add fruit, add yogurt)
-- Cooking method improvements
-
-5) Personalized Meal Pattern Suggestions
-- Pattern option(s)
-- Example next meals/snacks
-- If user profile missing: ask minimal profile questions at the end
-
-6) Assumptions & Confidence
-- Assumptions used
-- Confidence rating overall and key uncertainties
-
-────────────────────────────────────────────────────────────────────────────
-C) USER PROFILE (FOR PERSONALIZATION)
-────────────────────────────────────────────────────────────────────────────
-If personalization is requested OR useful and the user has not provided details, ask for:
-- age, sex
-- height, weight (optional but helpful)
-- activity level
-- goal (fat loss / muscle gain / performance / health condition support)
-- dietary preference (vegetarian/halal/etc.)
-- allergies/intolerances
-- relevant health conditions (optional)
-
-Keep questions short and only ask what is needed.
-
-────────────────────────────────────────────────────────────────────────────
-D) PROFESSIONAL & SAFETY BOUNDARIES
-────────────────────────────────────────────────────────────────────────────
-- You are not a doctor and do not diagnose or treat disease.
-- Provide general nutrition education and safe guidance.
-- If a user mentions serious symptoms, eating disorder history, pregnancy complications, or a medical condition requiring specialized care,
-  recommend consulting a registered dietitian/doctor.
-- Do not recommend extreme diets, starvation-level calories, unsafe supplements, or “detox/cleanse” claims.
-
-────────────────────────────────────────────────────────────────────────────
-E) QUALITY RULES
-────────────────────────────────────────────────────────────────────────────
-- Be factual and transparent.
-- Prefer metric units and include common household equivalents (g + cups/pieces) when possible.
-- Use ranges when uncertain.
-- Never claim brand-specific values unless the brand is known.
-- Avoid overconfidence; clearly separate what is known from what is estimated.
-
-Your mission: deliver human-quality meal analysis, nutrition calculation, and personalized meal guidance from images and text, safely and accurately.
-"""
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+        response, tokens_used = await _create_json_completion(
+            [
                 {
                     "role": "system",
-                    "content": system_prompt
+                    "content": SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
@@ -310,25 +238,186 @@ Your mission: deliver human-quality meal analysis, nutrition calculation, and pe
                         {
                             "type": "image_url",
                             "image_url": {
-                            "url": f"data:{mime_type};base64,{image_base64}"}
+                            "url": image_url}
                         }
                     ]
                 }
             ],
-            max_tokens=2000,
-            temperature=0.7
+            max_tokens=800
         )
 
-
-        analysis_text = response.choices[0].message.content
+        analysis = MealAnalysis.model_validate_json(response.choices[0].message.content)
 
         return {
-            "analysis": analysis_text,
+            "analysis": analysis.model_dump(),
             "model": response.model,
-            "tokens_used": response.usage.total_tokens,
+            "tokens_used": tokens_used,
             "image_path": image_path,
             "user_question": user_question
         }
     
     except Exception as e:
         raise RuntimeError(f"OpenAI Vision API analysis failed: {e}") from e
+
+
+# Vision analyses started by submit_meal_image, keyed by task id until polled or expired.
+# Held in this process only: with several server workers, a task must be polled from the
+# same request (graph run) that submitted it.
+_pending_analyses: Dict[str, asyncio.Task] = {}
+
+# Longest a single poll_meal_image call may block waiting for a result
+MAX_POLL_WAIT_SECONDS = 30.0
+
+# Finished analyses that are never polled are dropped after this long
+RESULT_TTL_SECONDS = 600.0
+
+def _on_analysis_done(task_id: str, task: asyncio.Task) -> None:
+    """Retrieve the task's outcome (so failures are not logged as unretrieved) and schedule its eviction."""
+    if not task.cancelled():
+        task.exception()
+    asyncio.get_running_loop().call_later(
+        RESULT_TTL_SECONDS, _pending_analyses.pop, task_id, None
+    )
+
+@tool
+async def submit_meal_image(image_path: str, user_question: str = "") -> dict:
+    """
+    Start a meal image analysis in the background and return immediately.
+
+    Vision analysis takes several seconds. Submit it first, keep working on other
+    tool calls (e.g. web searches) in the same turn, then collect the result with
+    poll_meal_image.
+
+    Args:
+        image_path (str):
+            Local path to the meal image file (jpg/png/webp).
+        user_question (str):
+            A specific question or context about the meal.
+
+    Returns:
+        dict: {"task_id": str, "status": "pending"}
+    """
+    task_id = uuid.uuid4().hex
+    task = asyncio.create_task(_analyze_meal_image_impl(image_path, user_question))
+    task.add_done_callback(functools.partial(_on_analysis_done, task_id))
+    _pending_analyses[task_id] = task
+    return {"task_id": task_id, "status": "pending"}
+
+@tool
+async def poll_meal_image(task_id: str, wait_seconds: float = 0.0) -> dict:
+    """
+    Get the result of an analysis started with submit_meal_image.
+
+    Args:
+        task_id (str):
+            The task_id returned by submit_meal_image.
+        wait_seconds (float):
+            How long to wait for the analysis to finish before reporting it as
+            still pending (capped at 30 seconds).
+
+    Returns:
+        dict:
+            - {"task_id", "status": "pending"} while the analysis is running
+            - {"task_id", "status": "done", "result": <analyze_meal_image result>}
+            - {"task_id", "status": "failed", "error": str}
+            - {"task_id", "status": "unknown"} for an unknown, already collected or expired task,
+              or one submitted by another server worker
+    """
+    task = _pending_analyses.get(task_id)
+    if task is None:
+        return {"task_id": task_id, "status": "unknown"}
+
+    if wait_seconds > 0:
+        await asyncio.wait({task}, timeout=min(wait_seconds, MAX_POLL_WAIT_SECONDS))
+    if not task.done():
+        return {"task_id": task_id, "status": "pending"}
+
+    _pending_analyses.pop(task_id, None)
+    if task.cancelled():
+        return {"task_id": task_id, "status": "failed", "error": "Analysis was cancelled"}
+    if task.exception() is not None:
+        return {"task_id": task_id, "status": "failed", "error": str(task.exception())}
+    return {"task_id": task_id, "status": "done", "result": task.result()}
+
+@tool
+async def analyze_meal_images(image_paths: List[str], user_question: str = "") -> dict:
+    """
+    Analyze several meal images (e.g. breakfast, lunch and dinner photos) together.
+
+    Images are sent as multiple image parts of one Vision request instead of one
+    request per image, so the per-request overhead is paid once per batch.
+
+    Args:
+        image_paths (List[str]):
+            Local paths to the meal image files (jpg/png/webp).
+        user_question (str):
+            A question or context that applies to all of the meals.
+
+    Returns:
+        dict:
+            - meals: one entry per image (image_index, detected_items, per_item_nutrition,
+              meal_totals, classification, suggestions, assumptions, confidence)
+            - tokens_used, image_paths, user_question
+            - or {"error": str, "image_paths": [...]} if any image could not be analyzed
+    """
+    try:
+        return await _analyze_meal_images_impl(image_paths, user_question)
+    except Exception as e:
+        return {"error": str(e), "image_paths": image_paths}
+
+async def _analyze_meal_images_impl(image_paths: List[str], user_question: str) -> dict:
+    """Split the images into batches, analyze them concurrently and merge the results in input order."""
+    batches = [
+        image_paths[start:start + MAX_IMAGES_PER_REQUEST]
+        for start in range(0, len(image_paths), MAX_IMAGES_PER_REQUEST)
+    ]
+    results = await asyncio.gather(
+        *(_analyze_meal_image_batch(batch, user_question) for batch in batches)
+    )
+
+    meals = []
+    tokens_used = 0
+    for offset, batch, (batch_result, batch_tokens) in zip(
+        range(0, len(image_paths), MAX_IMAGES_PER_REQUEST), batches, results
+    ):
+        # The model must return one entry per image, each pointing at a distinct image of this batch
+        indices = sorted(meal.image_index for meal in batch_result.meals)
+        if indices != list(range(len(batch))):
+            raise RuntimeError(
+                f"Vision batch returned image_index values {indices} for {len(batch)} images"
+            )
+        tokens_used += batch_tokens
+        for meal in sorted(batch_result.meals, key=lambda meal: meal.image_index):
+            meal.image_index += offset
+            meals.append(meal.model_dump())
+
+    return {
+        "meals": meals,
+        "tokens_used": tokens_used,
+        "image_paths": image_paths,
+        "user_question": user_question
+    }
+
+async def _analyze_meal_image_batch(image_paths: List[str], user_question: str) -> tuple[MealImageBatch, int]:
+    """Send one Vision request containing every image in the batch."""
+    image_urls = await asyncio.gather(
+        *(asyncio.to_thread(_image_data_url, image_path) for image_path in image_paths)
+    )
+    try:
+        content = [{"type": "text", "text": user_question or "Analyze these meal images"}]
+        for image_url in image_urls:
+            content.append({"type": "image_url", "image_url": {"url": image_url}})
+
+        response, tokens_used = await _create_json_completion(
+            [
+                {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": content}
+            ],
+            max_tokens=800 * len(image_paths)
+        )
+
+        batch = MealImageBatch.model_validate_json(response.choices[0].message.content)
+        return batch, tokens_used
+
+    except Exception as e:
+        raise RuntimeError(f"OpenAI Vision API batch analysis failed: {e}") from e
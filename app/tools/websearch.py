@@ -1,21 +1,14 @@
-import os
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
 from typing import Optional, List, Dict, Any
 from langchain_tavily import TavilySearch
 from langchain_core.tools import tool
-from dotenv import load_dotenv
+from ..config import TAVILY_API_KEY
 
-
-load_dotenv()
-
-# Initialize Tavily Search tool with LangChain
-tavily_tool = TavilySearch(
-    max_results=5,
-    search_depth="advanced",
-    include_answer=True,
-    include_raw_content=False,
-    include_images=False,
-    tavily_api_key=os.environ.get("TAVILY_API_KEY")
-)
+# Upper bound on concurrent Tavily requests issued by web_search_nutrition_many
+_tavily_semaphore = asyncio.Semaphore(8)
 
 
 @tool
@@ -38,31 +31,110 @@ def web_search_nutrition(query: str) -> str:
         A formatted string containing search results with titles, URLs, and content snippets
     """
     try:
-        results = tavily_tool.invoke({"query": query})
+        return _search(" ".join(query.lower().split()))
+    except Exception as e:
+        return f"Error performing web search: {str(e)}"
+
+
+# Formatted results by normalized query, shared by the sync and async search paths (LRU order)
+_SEARCH_CACHE_SIZE = 1024
+_search_cache: "OrderedDict[str, str]" = OrderedDict()
+_search_cache_lock = threading.Lock()
+
+
+def _cache_get(query: str) -> Optional[str]:
+    with _search_cache_lock:
+        result = _search_cache.get(query)
+        if result is not None:
+            _search_cache.move_to_end(query)
+        return result
+
+
+def _cache_put(query: str, result: str) -> None:
+    with _search_cache_lock:
+        _search_cache[query] = result
+        _search_cache.move_to_end(query)
+        if len(_search_cache) > _SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+
+
+def _search(query: str) -> str:
+    """Run a Tavily search for an already-normalized query, memoizing the formatted result."""
+    result = _cache_get(query)
+    if result is None:
+        result = _format_results(query, get_tavily_search_tool().invoke({"query": query}))
+        _cache_put(query, result)
+    return result
+
+
+def _format_results(query: str, results: Any) -> str:
+    """Render Tavily results as the numbered text block returned to the agent; raises on a Tavily error."""
+    # langchain-tavily returns the raw response dict; the hits live under "results".
+    # Failed requests come back as {"error": ...} instead of raising; raise here so the
+    # failure reaches the agent and is never cached as an empty result.
+    if isinstance(results, dict):
+        if "error" in results:
+            raise RuntimeError(str(results["error"]))
+        results = results.get("results")
 
-        if not results:
-            return "No results found for the query."
+    if not results:
+        return "No results found for the query."
 
-        # Format results for better readability
-        formatted_output = f"Search Results for: '{query}'\n\n"
+    # Format results for better readability
+    parts: List[str] = [f"Search Results for: '{query}'\n\n"]
 
-        for idx, result in enumerate(results, 1):
-            formatted_output += f"{idx}. {result.get('title', 'No title')}\n"
-            formatted_output += f"   URL: {result.get('url', 'No URL')}\n"
-            formatted_output += f"   Content: {result.get('content', 'No content')}\n"
-            if result.get('score'):
-                formatted_output += f"   Relevance Score: {result.get('score')}\n"
-            formatted_output += "\n"
+    for idx, result in enumerate(results, 1):
+        title = result.get("title") or "No title"
+        url = result.get("url") or "No URL"
+        content = result.get("content") or "No content"
+        score = result.get("score")
+        parts.append(f"{idx}. {title}\n   URL: {url}\n   Content: {content}\n")
+        if score:
+            parts.append(f"   Relevance Score: {score}\n")
+        parts.append("\n")
 
-        return formatted_output
+    return "".join(parts)
+
+
+@tool
+async def web_search_nutrition_many(queries: List[str]) -> List[str]:
+    """
+    Search the web for several independent nutrition questions in parallel using Tavily.
+
+    Prefer this over repeated web_search_nutrition calls when you need data for
+    many items at once, e.g. the nutrition facts of every ingredient in a meal.
+
+    Args:
+        queries: The search queries, one per ingredient or question
+
+    Returns:
+        A list of formatted result strings, in the same order as the queries
+    """
+    return await asyncio.gather(*(_asearch(query) for query in queries))
+
+
+async def _asearch(query: str) -> str:
+    """Async counterpart of web_search_nutrition for a single query; shares its result cache."""
+    query = " ".join(query.lower().split())
+    result = _cache_get(query)
+    if result is not None:
+        return result
+    try:
+        async with _tavily_semaphore:
+            results = await get_tavily_search_tool().ainvoke({"query": query})
+        result = _format_results(query, results)
+        _cache_put(query, result)
+        return result
 
     except Exception as e:
         return f"Error performing web search: {str(e)}"
 
 
+@functools.lru_cache(maxsize=8)
 def get_tavily_search_tool(max_results: int = 5) -> TavilySearch:
     """
     Get a configured Tavily search tool instance for use with LangChain agents.
+    Instances are created on first use and shared per max_results value.
 
     Args:
         max_results: Maximum number of search results to return
@@ -76,5 +148,5 @@ def get_tavily_search_tool(max_results: int = 5) -> TavilySearch:
         include_answer=True,
         include_raw_content=False,
         include_images=False,
-        tavily_api_key=os.environ.get("TAVILY_API_KEY")
+        tavily_api_key=TAVILY_API_KEY
     )
@@ -1,36 +1,117 @@
 import uvicorn
 import os
+import io
+import asyncio
+import contextlib
+import pathlib
 import logging
 import getpass
 import platform
 import hashlib
-import tempfile
 import traceback
 import datetime
 import json
-import shutil
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import orjson
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, UploadFile, File
 from PIL import Image
 from fastapi.middleware.cors import CORSMiddleware
-from app.agent.workflow import build_workflow
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from app.config import CORS_ORIGINS
+from app.agent.workflow import SHARED_CHECKPOINTER, build_workflow, setup_persistence
+from app.tools.meals_detect import analyze_meal_image
 from pydantic import BaseModel, model_validator
 from typing import Optional, List
 from langchain_core.messages import HumanMessage, AIMessage
 
-main = FastAPI(title="Food Quality Checking Agent API")
+main = FastAPI(title="Food Quality Checking Agent API", default_response_class=ORJSONResponse)
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# meals.jsonl: one JSON record per line; meals.counter: last allocated meal id
+MEALS_PATH = os.path.join("app", "tools", "meals.jsonl")
+MEALS_COUNTER_PATH = os.path.join("app", "tools", "meals.counter")
+# Pre-JSONL storage (a single JSON array); merged into meals.jsonl at startup, see _migrate_legacy_meals
+LEGACY_MEALS_PATH = os.path.join("app", "tools", "meals.json")
+UPLOADS_DIR = os.path.join("uploads", "meals")
+# One small <id>.json per meal holding its analysis status, so polling never scans meals.jsonl
+MEAL_ANALYSES_DIR = os.path.join("app", "tools", "meal_analyses")
+
+# A meal still pending after this long (e.g. its worker died mid-analysis) is reported as failed
+ANALYSIS_TIMEOUT_SECONDS = int(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "600"))
+
+# Uploads are read from the request in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Largest request body accepted, so one client cannot exhaust a worker's memory or disk
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+
+_ALLOWED_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg"})
+
+# Leading bytes of the accepted formats (PNG, JPEG)
+_IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff")
+
+class RequestSizeLimitMiddleware:
+    """
+    Pure ASGI middleware rejecting request bodies larger than max_bytes with a 413.
+    Content-Length is checked up front; the bytes actually received are counted as well,
+    so chunked bodies sent without a Content-Length are bounded too.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds the {self.max_bytes} byte limit."
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = ORJSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the route, so FastAPI turns it into the 413 response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+# Added before CORSMiddleware so CORS stays the outermost layer and 413s carry CORS headers
+main.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
 main.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    # Browsers cache the preflight result for a day instead of repeating it per request
+    max_age=86400,
 )
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-workflow_app = build_workflow()
+@main.on_event("startup")
+async def _init_workflow():
+    """Build the agent graph once per worker, after startup rather than at import."""
+    # Create storage once so upload handlers can skip the mkdir/exists syscalls
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    os.makedirs(MEAL_ANALYSES_DIR, exist_ok=True)
+    await asyncio.to_thread(
+        _migrate_legacy_meals, LEGACY_MEALS_PATH, MEALS_PATH, MEALS_COUNTER_PATH
+    )
+    pathlib.Path(MEALS_PATH).touch(exist_ok=True)
+    checkpointer, memory_store = await setup_persistence()
+    main.state.workflow = await asyncio.to_thread(build_workflow, checkpointer, memory_store)
 
 class ChatMessage(BaseModel):
     role: str
@@ -64,8 +145,14 @@ class UploadResponse(BaseModel):
     status: str
     detail: str
     document_path: Optional[str] = None
+    status_url: Optional[str] = None
 
-def get_user_id() -> str:
+class MealAnalysisResponse(BaseModel):
+    id: int
+    status: str
+    analysis: Optional[dict] = None
+
+def _compute_user_id() -> str:
     """Generate a consistent user ID based on system information."""
     username = getpass.getuser()
     machine_name = platform.node()
@@ -73,37 +160,226 @@ def get_user_id() -> str:
     user_hash = hashlib.md5(user_info.encode()).hexdigest()[:8]
     return f"user_{user_hash}"
 
+# Invariant for the process lifetime, so computed once at import
+_USER_ID = _compute_user_id()
+
+_CHAT_CONFIG = {
+    "configurable":{
+        "thread_id": f"{_USER_ID}_api_session",
+        "user_id": _USER_ID,
+    }
+}
+
+def get_user_id() -> str:
+    """Return the consistent user ID for this machine."""
+    return _USER_ID
+
+def _verify_image(data: bytes) -> Optional[str]:
+    """Check image integrity with PIL, returning the error text instead of raising (None if valid)."""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()
+    except Exception as e:
+        return str(e)
+    return None
+
+def _write_image(path: str, data: bytes) -> None:
+    """Write the validated upload straight to its final location."""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+@contextlib.contextmanager
+def _exclusive_lock(f):
+    """Hold an exclusive cross-process lock on an open file (flock on POSIX, msvcrt on Windows)."""
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _max_meal_id(path: str) -> int:
+    """Return the highest stored meal id, streaming the JSONL file line by line."""
+    last_id = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                last_id = max(last_id, orjson.loads(line).get("id", 0))
+    return last_id
+
+def _next_meal_id(counter_path: str, meals_path: str) -> int:
+    """
+    Atomically increment the persisted meal id counter and return the new id.
+    The counter is seeded from the stored records the first time it is used.
+    """
+    with open(counter_path, 'a+b') as f:
+        with _exclusive_lock(f):
+            f.seek(0)
+            raw = f.read().strip()
+            new_id = (int(raw) if raw else _max_meal_id(meals_path)) + 1
+            f.seek(0)
+            f.truncate()
+            f.write(str(new_id).encode())
+            f.flush()
+            os.fsync(f.fileno())
+    return new_id
+
+def _migrate_legacy_meals(legacy_path: str, meals_path: str, counter_path: str) -> None:
+    """
+    Merge the records of a legacy meals.json array into meals.jsonl, matched by id.
+    Only meals missing from meals.jsonl are appended, so this is safe to run on every startup,
+    and the id counter is raised past the merged ids so new uploads never reuse them.
+    """
+    if not os.path.exists(legacy_path):
+        return
+    with open(legacy_path, 'rb') as legacy:
+        meals = orjson.loads(legacy.read())
+    if not isinstance(meals, list):
+        raise RuntimeError(f"{legacy_path} is not a JSON array of meal records")
+
+    with open(meals_path, 'a+b') as f:
+        with _exclusive_lock(f):
+            f.seek(0)
+            stored_ids = {orjson.loads(line).get("id") for line in f if line.strip()}
+            missing = [meal for meal in meals if meal.get("id") not in stored_ids]
+            if not missing:
+                return
+            f.write(b"".join(orjson.dumps(meal) + b"\n" for meal in missing))
+            f.flush()
+            os.fsync(f.fileno())
+
+    max_id = max(meal.get("id", 0) for meal in missing)
+    with open(counter_path, 'a+b') as f:
+        with _exclusive_lock(f):
+            f.seek(0)
+            raw = f.read().strip()
+            # A missing counter is seeded from meals.jsonl on first use, which now has these ids
+            if raw and int(raw) < max_id:
+                f.seek(0)
+                f.truncate()
+                f.write(str(max_id).encode())
+                f.flush()
+                os.fsync(f.fileno())
+    logger.info("Merged %d meal records from %s into %s", len(missing), legacy_path, meals_path)
+
+def _append_meal(path: str, meal: dict) -> None:
+    """
+    Append one meal record as a single JSON line; existing records are never rewritten.
+    A later line with the same id updates the fields it carries (e.g. analysis_response).
+    The write is done under an exclusive lock so lines from concurrent workers never interleave.
+    """
+    line = orjson.dumps(meal) + b"\n"
+    with open(path, 'ab') as f:
+        with _exclusive_lock(f):
+            f.write(line)
+            f.flush()
+
+def _read_meal(path: str, meal_id: int) -> Optional[dict]:
+    """Merge every JSONL line for a meal id into one record; None if the meal does not exist."""
+    meal = None
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            if record.get("id") == meal_id:
+                meal = {**meal, **record} if meal else record
+    return meal
+
+def _analysis_status_path(meal_id: int) -> str:
+    return os.path.join(MEAL_ANALYSES_DIR, f"{meal_id}.json")
+
+def _write_analysis_status(meal_id: int, status: dict) -> None:
+    """Replace a meal's analysis status file atomically, so readers never see a partial write."""
+    path = _analysis_status_path(meal_id)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(status))
+    os.replace(tmp_path, path)
+
+def _read_analysis_status(meal_id: int) -> Optional[dict]:
+    """Return a meal's analysis status file, or None if it has none."""
+    try:
+        with open(_analysis_status_path(meal_id), 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+async def _store_analysis(meal_id: int, image_path: str, question: str, started_at: str) -> None:
+    """Background task: analyze an uploaded meal, append the result to its record and publish its status."""
+    analysis = await _run_analysis(meal_id, image_path, question)
+    await asyncio.to_thread(
+        _append_meal, MEALS_PATH, {"id": meal_id, "analysis_response": analysis}
+    )
+    await asyncio.to_thread(
+        _write_analysis_status,
+        meal_id,
+        {
+            "status": "failed" if "error" in analysis else "done",
+            "started_at": started_at,
+            "analysis": analysis,
+        },
+    )
+
+async def _run_analysis(meal_id: int, image_path: str, question: str) -> dict:
+    """Run the Vision analysis for a stored meal, returning an error dict instead of raising."""
+    try:
+        analysis = await analyze_meal_image.ainvoke(
+            {"image_path": image_path, "user_question": question}
+        )
+        logger.info(f"OpenAI Vision analysis completed for meals {meal_id}")
+        return analysis
+    except Exception as e:
+        logger.warning(f"OpenAI Vision analysis failed for meals {meal_id}: {e}\n{traceback.format_exc()}")
+        return {"error": str(e)}
+
+
+# Health probes are the hottest path; serialize the body once and reuse it
+_HEALTH_RESPONSE = ORJSONResponse({"status": "ok"})
 
 @main.get("/health")
 def health():
-    return {"status": "ok"}
+    return _HEALTH_RESPONSE
 
-# chat Endpoint 
-@main.post("/api/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
-    try:
-        config = {
-            "configurable":{
-                 "thread_id": f"{get_user_id()}_api_session",
-                "user_id": get_user_id(),
-            }
-        }
+_ROLE_TO_MESSAGE = {"user": HumanMessage, "assistant": AIMessage}
 
-        combined_text = req.combined_message()
+async def build_input_state(req: ChatRequest, workflow) -> dict:
+    """
+    Convert the new message (plus client history, if needed) into graph input.
+    The checkpointer already replays the session thread, so client-sent history is
+    only used to seed a thread that has no stored messages yet (e.g. after a restart).
+    """
+    messages = [HumanMessage(content=req.combined_message())]
 
-        messages = []
-        if req.history:
-            for msg in req.history:
-                if msg.role == "user":
-                    messages.append(HumanMessage(content=msg.content))
-                else:
-                    messages.append(AIMessage(content=msg.content))
-        messages.append(HumanMessage(content=combined_text))
+    if req.history:
+        snapshot = await workflow.aget_state(_CHAT_CONFIG)
+        if not snapshot.values.get("messages"):
+            messages = [
+                _ROLE_TO_MESSAGE.get(msg.role, AIMessage)(content=msg.content)
+                for msg in req.history
+            ] + messages
 
-        input_state = {"messages": messages}
+    return {"messages": messages}
+
+# chat Endpoint 
+@main.post("/api/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest, request: Request):
+    try:
+        config = _CHAT_CONFIG
+        input_state = await build_input_state(req, request.app.state.workflow)
 
         response_content = ""
-        for step in workflow_app.stream(input_state, config, stream_mode="values"):
+        async for step in request.app.state.workflow.astream(input_state, config, stream_mode="values"):
             messages = step["messages"][-1]
             if hasattr(messages, "content"):
                 response_content = messages.content
@@ -120,60 +396,70 @@ async def chat(req: ChatRequest):
         return ChatResponse(content=f"**Configuration Error:** {e}")
     except Exception as e:
         return ChatResponse(content=f"**Error:** {e}")
+
+# Streaming chat endpoint: answer tokens as server-sent events
+@main.post("/api/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """Stream the final answer token by token; each SSE data field is a JSON-encoded string."""
+    config = _CHAT_CONFIG
+    workflow_app = request.app.state.workflow
+    input_state = await build_input_state(req, workflow_app)
+
+    async def event_stream():
+        try:
+            async for event in workflow_app.astream_events(input_state, config, version="v2"):
+                # Only the synthesize node writes the user-facing answer
+                if (
+                    event["event"] == "on_chat_model_stream"
+                    and event["metadata"].get("langgraph_node") == "synthesize"
+                ):
+                    content = event["data"]["chunk"].content
+                    if content:
+                        yield f"data: {json.dumps(content)}\n\n"
+        except Exception as e:
+            logger.error("Chat stream failed: %s\n%s", e, traceback.format_exc())
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+        yield "event: end\ndata: \n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
     
 # Image uploading endpoint 
-@main.post("/api/upload", response_model=UploadResponse)
-async def upload_image (file: UploadFile = File(...), description: str = ""):
-    """Upload meals image, save it to uploads/meals, and analyze using OpenAI Vision API."""
+@main.post("/api/upload", status_code=202, response_model=UploadResponse)
+async def upload_image (background_tasks: BackgroundTasks, file: UploadFile = File(...), description: str = ""):
+    """Upload meals image, save it to uploads/meals, and analyze it in the background using OpenAI Vision API."""
 
-    allowed_extensions = (".png", ".jpg", ".jpeg")
-    if not file.filename.lower().endswith(allowed_extensions):
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    if file_extension not in _ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Only PNG, JPG, and JPEG images are accepted.")
     
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-            tmp_path = tmp.name
-            contents = await file.read()
-            tmp.write(contents)
-    except Exception as e:
-        logger.error("Failed to save image upload: %s\n%s", e, traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Failed to save upload: {e}")
-    
-    # Validate image 
-    def validate_image(path: str):
-        try:
-            with Image.open(path) as img:
-                img.verify()
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid image file: {e}")
-
-    try:
-        validate_image(tmp_path)
+        # Read the upload in chunks; it is validated in memory and written to disk once.
+        # RequestSizeLimitMiddleware already capped the body at MAX_UPLOAD_BYTES.
+        chunks = []
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            chunks.append(chunk)
+        image_data = b"".join(chunks)
     except HTTPException:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
         raise
+    except Exception as e:
+        logger.error("Failed to read image upload: %s\n%s", e, traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Failed to read upload: {e}")
+    
+    # Validate image: cheap magic-number check first, full PIL verify off the event loop
+    if not image_data.startswith(_IMAGE_SIGNATURES):
+        raise HTTPException(status_code=400, detail="Invalid image file: not a PNG or JPEG image")
 
-    # meals.json 
-    meals_json_path = os.path.join("app", "tools", "meals.json")
-    uploads_dir = os.path.join("uploads", "meals")
-    os.makedirs(uploads_dir, exist_ok=True)
+    error = await asyncio.to_thread(_verify_image, image_data)
+    if error:
+        raise HTTPException(status_code=400, detail=f"Invalid image file: {error}")
 
     try:
-        if os.path.exists(meals_json_path):
-            with open(meals_json_path, 'r', encoding='utf-8') as f:
-                meals_data = json.load(f)
-        else:
-            meals_data = []
-
-        new_id = max([meal.get("id", 0) for meal in meals_data], default=0) + 1
+        new_id = await asyncio.to_thread(_next_meal_id, MEALS_COUNTER_PATH, MEALS_PATH)
 
-        file_extension = os.path.splitext(file.filename)[1]
-        new_filename = f"meals_{new_id}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}{file_extension}"
-        final_image_path = os.path.join(uploads_dir, new_filename)
-        shutil.move(tmp_path, final_image_path)
+        uploaded_at = datetime.datetime.now()
+        new_filename = f"meals_{new_id}_{uploaded_at.strftime('%Y%m%d_%H%M%S')}{file_extension}"
+        final_image_path = os.path.join(UPLOADS_DIR, new_filename)
+        await asyncio.to_thread(_write_image, final_image_path, image_data)
 
         # Create plant record
         new_meals = {
@@ -181,41 +467,15 @@ async def upload_image (file: UploadFile = File(...), description: str = ""):
             "name": file.filename,
             "description": description or "No description provided",
             "image_path": final_image_path,
-            "upload_date": datetime.datetime.now().isoformat(),
-            "user_id": get_user_id()
+            "upload_date": uploaded_at.isoformat(),
+            "user_id": get_user_id(),
+            "analysis_response": None
         }
-
-        analysis_result = None 
-
-         # Analyze with OpenAI Vision API
-        try:
-            from app.tools.meals_detect import analyze_meal_image
-            
-            question = f"{description} with this image" if description else "Analyze this meal image"
-            
-            analysis = analyze_meal_image(final_image_path, question)
-            
-            new_meals["analysis_response"] = analysis
-            analysis_result = analysis
-            logger.info(f"OpenAI Vision analysis completed for meals {new_id}")
-        except Exception as e:
-            logger.warning(f"OpenAI Vision analysis failed for meals {new_id}: {e}\n{traceback.format_exc()}")
-            error_result = {"error": str(e)}
-            new_meals["analysis_response"] = error_result
-            analysis_result = error_result
-
-        meals_data.append(new_meals)
-        with open(meals_json_path, 'w', encoding='utf-8') as f:
-            json.dump(meals_data, f, indent=2, ensure_ascii=False)
-
-        logger.info(f"Successfully uploaded and analyzed meal {new_id}: {new_filename}")
-        
-        # Return success response
-        return UploadResponse(
-            status="success",
-            detail=f"Meal image uploaded and analyzed successfully. ID: {new_id}",
-            document_path=final_image_path,
-            analysis=analysis_result 
+        await asyncio.to_thread(_append_meal, MEALS_PATH, new_meals)
+        await asyncio.to_thread(
+            _write_analysis_status,
+            new_id,
+            {"status": "pending", "started_at": new_meals["upload_date"], "analysis": None},
         )
 
     except Exception as e:
@@ -227,5 +487,60 @@ async def upload_image (file: UploadFile = File(...), description: str = ""):
             pass
         raise HTTPException(status_code=500, detail=f"Failed to save meal data: {e}")
 
+    # Analyze with OpenAI Vision API after the response is sent; clients poll status_url
+    question = f"{description} with this image" if description else "Analyze this meal image"
+    background_tasks.add_task(
+        _store_analysis, new_id, final_image_path, question, new_meals["upload_date"]
+    )
+
+    logger.info(f"Successfully uploaded meal {new_id}: {new_filename}")
+
+    return UploadResponse(
+        status="accepted",
+        detail=f"Meal image uploaded; analysis in progress. ID: {new_id}",
+        document_path=final_image_path,
+        status_url=f"/api/meals/{new_id}/analysis"
+    )
+
+@main.get("/api/meals/{meal_id}/analysis", response_model=MealAnalysisResponse)
+async def get_meal_analysis(meal_id: int):
+    """Return the Vision analysis of an uploaded meal, or its pending/failed status."""
+    record = await asyncio.to_thread(_read_analysis_status, meal_id)
+    if record is None:
+        # Meals stored before status files existed: fall back to their JSONL record
+        meal = await asyncio.to_thread(_read_meal, MEALS_PATH, meal_id)
+        if meal is None:
+            raise HTTPException(status_code=404, detail=f"Meal {meal_id} not found.")
+        analysis = meal.get("analysis_response")
+        if analysis is None:
+            status = "pending"
+        elif "error" in analysis:
+            status = "failed"
+        else:
+            status = "done"
+        return MealAnalysisResponse(id=meal_id, status=status, analysis=analysis)
+
+    status, analysis = record["status"], record["analysis"]
+    if status == "pending":
+        started_at = datetime.datetime.fromisoformat(record["started_at"])
+        elapsed = (datetime.datetime.now() - started_at).total_seconds()
+        if elapsed > ANALYSIS_TIMEOUT_SECONDS:
+            status = "failed"
+            analysis = {"error": f"Analysis did not finish within {ANALYSIS_TIMEOUT_SECONDS} seconds."}
+    return MealAnalysisResponse(id=meal_id, status=status, analysis=analysis)
+
 if __name__ == "__main__":
-    uvicorn.run("main:main", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    if os.getenv("UVICORN_RELOAD") == "1":
+        # Single process with auto-reload for local development
+        uvicorn.run("main:main", host="0.0.0.0", port=8000, reload=True)
+    else:
+        # Spread traffic across cores only when the chat thread lives in Redis; with the
+        # in-memory checkpointer each worker would hold its own copy of the session thread,
+        # so extra workers are refused. The submit/poll task map stays per worker even with
+        # Redis: a task submitted in one request and polled in a later one may land on another
+        # worker and report "unknown" (the agent is told to collect results in the same turn).
+        default_workers = 2 * (os.cpu_count() or 1) + 1 if SHARED_CHECKPOINTER else 1
+        workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
+        if workers > 1 and not SHARED_CHECKPOINTER:
+            raise SystemExit("WEB_CONCURRENCY > 1 requires REDIS_URL so workers share chat state")
+        uvicorn.run("main:main", host="0.0.0.0", port=8000, workers=workers)
\ No newline at end of file